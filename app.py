@@ -1,13 +1,17 @@
 import os
 import json
 import random
+import mimetypes
 from datetime import datetime
 from functools import wraps
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory
+from werkzeug.security import safe_join
 from pymongo import MongoClient
 from werkzeug.security import generate_password_hash, check_password_hash
 import utils
+import events
+import migrate
 import openai
 import smtplib
 from email.message import EmailMessage
@@ -18,8 +22,10 @@ MONGO_URI = os.getenv('MONGO_URI')
 if not MONGO_URI:
     raise RuntimeError('MONGO_URI not set in environment')
 
+MONGO_DB = os.getenv('MONGO_DB', 'anleague')
+
 client = MongoClient(MONGO_URI)
-db = client.anleague
+db = client[MONGO_DB]
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if OPENAI_API_KEY:
@@ -45,6 +51,55 @@ if not users.find_one({'username': ADMIN_USERNAME}):
         'role': 'admin'
     })
 
+utils.ensure_player_indexes(db)
+events.ensure_event_indexes(db)
+migrate.run_migrations(db, log=app.logger.info)
+
+# Built front-end assets (see build_assets.py): hashed names from the manifest,
+# served precompressed with immutable caching. Missing manifest -> CDN fallback.
+DIST_DIR = os.path.join(app.static_folder, 'dist')
+try:
+    with open(os.path.join(DIST_DIR, 'manifest.json')) as f:
+        ASSET_MANIFEST = json.load(f)
+except (OSError, ValueError):
+    ASSET_MANIFEST = {}
+
+@app.context_processor
+def inject_asset_url():
+    def asset_url(name):
+        hashed = ASSET_MANIFEST.get(name)
+        return url_for('built_asset', filename=hashed) if hashed else None
+    return {'asset_url': asset_url}
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    resp = None
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        path = safe_join(DIST_DIR, filename + ext)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            resp = send_from_directory(DIST_DIR, filename + ext, mimetype=mimetype, max_age=31536000)
+            resp.headers['Content-Encoding'] = encoding
+            break
+    if resp is None:
+        resp = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=31536000)
+    resp.vary.add('Accept-Encoding')
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 31536000
+    resp.cache_control.immutable = True
+    return resp
+
+@app.after_request
+def cache_media(resp):
+    # ogg/webp match assets go through Flask's static view, which already
+    # answers Range requests (206); just let browsers keep them around
+    if request.path.startswith('/static/assets/') and resp.status_code in (200, 206, 304):
+        # the static view marks files no-cache when no max age is configured
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 86400
+    return resp
+
 # Helpers
 def login_required(f):
     @wraps(f)
@@ -100,6 +155,7 @@ def register():
         # insert team then create representative user
         res = db.teams.insert_one(team)
         team_id = res.inserted_id
+        utils.register_team_players(db, team)
         rep_password = data.get('rep_password')
         # create rep user if not exists
         if users.find_one({'username': rep_email}):
@@ -193,10 +249,12 @@ def rep_dashboard():
     from bson.objectid import ObjectId
     team = None
     matches = []
+    player_stats = {}
     if rep and rep.get('team_id'):
         team = db.teams.find_one({'_id': ObjectId(rep['team_id'])})
         matches = list(db.matches.find({'$or': [{'team1': team['_id']}, {'team2': team['_id']}] }).sort('created_at', 1))
-    return render_template('rep_dashboard.html', team=team, matches=matches)
+        player_stats = {p['_id']: p for p in db.players.find({'team_id': team['_id']})}
+    return render_template('rep_dashboard.html', team=team, matches=matches, player_stats=player_stats)
 
 @app.route('/admin')
 @login_required
@@ -214,6 +272,7 @@ def admin_seed():
     for _ in range(7):
         team = utils.demo_team()
         res = db.teams.insert_one(team)
+        utils.register_team_players(db, team)
         seeded.append(team['country'])
     flash('Seeded 7 demo teams: ' + ', '.join(seeded), 'success')
     return redirect(url_for('admin_dashboard'))
@@ -223,6 +282,7 @@ def admin_seed():
 def admin_add_eighth():
     team = utils.demo_team()
     db.teams.insert_one(team)
+    utils.register_team_players(db, team)
     flash('Added 8th team: ' + team['country'], 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -257,19 +317,19 @@ def admin_simulate_all():
     # simulate all unplayed matches sequentially
     from bson.objectid import ObjectId
     matches = list(db.matches.find({'played': False}).sort('created_at', 1))
+    results = []
     for m in matches:
-        t1 = db.teams.find_one({'_id': m['team1']})
-        t2 = db.teams.find_one({'_id': m['team2']})
-        result = utils.simulate_match(t1, t2, use_commentary=True, openai_client=openai if OPENAI_API_KEY else None)
-        db.matches.update_one({'_id': m['_id']}, {'$set': {
-            'played': True,
-            'score1': result['score1'],
-            'score2': result['score2'],
-            'scorers': result['scorers'],
-            'winner': result['winner_id'],
-            'commentary': result.get('commentary',''),
-            'played_at': datetime.utcnow()
-        }})
+        t1 = utils.ensure_player_ids(db, db.teams.find_one({'_id': m['team1']}))
+        t2 = utils.ensure_player_ids(db, db.teams.find_one({'_id': m['team2']}))
+        results.append((m, utils.simulate_match(t1, t2, use_commentary=True, openai_client=openai if OPENAI_API_KEY else None)))
+    # one batch for the whole round; scores, scorers and stats are derived from the log
+    logged, position = events.log_matches(db, [(m, result['events']) for m, result in results])
+    for m, result in results:
+        if m['_id'] in logged:
+            db.matches.update_one({'_id': m['_id']}, {'$set': {'commentary': result.get('commentary','')}})
+    # wait until this batch (and any batch still being written ahead of it)
+    # has reached the match docs, so 'played' below is up to date
+    events.consume(db, until=position)
     # record tournament if completed
     remaining = db.matches.count_documents({'played': False})
     if remaining == 0:
@@ -308,8 +368,7 @@ def admin_email():
 def analytics():
     teams = list(db.teams.find().sort('created_at', 1))
     enriched = []
-    for t in teams:
-        stats = utils.compute_team_stats(t, db)
+    for t, stats in zip(teams, events.team_stats(db, teams)):
         enriched.append({'country': t['country'], 'rating': t['rating'], 'stats': stats})
     return render_template('analytics.html', teams=enriched)
 
@@ -323,11 +382,42 @@ def leaderboard():
     scorers = utils.top_scorers(db, limit=20)
     return render_template('leaderboard.html', scorers=scorers)
 
+@app.route('/players')
+def players():
+    q = request.args.get('q', '')
+    results = utils.search_players(db, q, limit=50)
+    return render_template('players.html', players=results, q=q)
+
+@app.route('/player/<player_id>')
+def player_view(player_id):
+    from bson.objectid import ObjectId
+    from bson.errors import InvalidId
+    try:
+        player = db.players.find_one({'_id': ObjectId(player_id)})
+    except InvalidId:
+        player = None
+    if not player:
+        flash('Player not found', 'error')
+        return redirect(url_for('players'))
+    return render_template('player.html', player=player)
+
+@app.route('/api/players/search')
+def api_players_search():
+    q = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, 100))
+    results = utils.search_players(db, q, limit=limit)
+    return jsonify([utils.player_summary(p) for p in results])
+
 @app.route('/admin/remove_team/<team_id>', methods=['POST'])
 @login_required
 def admin_remove_team(team_id):
     from bson.objectid import ObjectId
     db.teams.delete_one({'_id': ObjectId(team_id)})
+    utils.delete_team_players(db, ObjectId(team_id))
     flash('Team removed', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -337,7 +427,9 @@ def admin_replace_team(team_id):
     from bson.objectid import ObjectId
     new_team = utils.demo_team()
     db.teams.delete_one({'_id': ObjectId(team_id)})
+    utils.delete_team_players(db, ObjectId(team_id))
     db.teams.insert_one(new_team)
+    utils.register_team_players(db, new_team)
     flash('Team replaced with ' + new_team['country'], 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -364,20 +456,21 @@ def admin_simulate(match_id):
     if not match:
         flash('Match not found', 'error')
         return redirect(url_for('admin_dashboard'))
-    team1 = db.teams.find_one({'_id': match['team1']})
-    team2 = db.teams.find_one({'_id': match['team2']})
+    if match.get('played'):
+        flash('Match already played', 'info')
+        return redirect(url_for('admin_dashboard'))
+    team1 = utils.ensure_player_ids(db, db.teams.find_one({'_id': match['team1']}))
+    team2 = utils.ensure_player_ids(db, db.teams.find_one({'_id': match['team2']}))
     # request commentary when possible (use OPENAI_API_KEY if configured)
     result = utils.simulate_match(team1, team2, use_commentary=True, openai_client=openai if OPENAI_API_KEY else None)
-    # store result
-    db.matches.update_one({'_id': match['_id']}, {'$set': {
-        'played': True,
-        'score1': result['score1'],
-        'score2': result['score2'],
-        'scorers': result['scorers'],
-        'winner': result['winner_id'],
-        'commentary': result.get('commentary', ''),
-        'played_at': datetime.utcnow()
-    }})
+    # store result: append the events, then fold them into the match doc and stats
+    logged, position = events.log_matches(db, [(match, result['events'])])
+    if not logged:
+        # simulated by a concurrent request in the meantime
+        flash('Match already played', 'info')
+        return redirect(url_for('admin_dashboard'))
+    db.matches.update_one({'_id': match['_id']}, {'$set': {'commentary': result.get('commentary', '')}})
+    events.consume(db, until=position)
     # notify teams
     notify_match_result(team1, team2, result)
     flash('Match simulated', 'success')
@@ -388,6 +481,7 @@ def admin_simulate(match_id):
 def admin_reset():
     # clear matches and reset to quarter finals state
     db.matches.delete_many({})
+    events.clear_log(db)
     flash('Tournament reset', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -0,0 +1,224 @@
+"""ASGI read-only surface for the public pages and JSON endpoints.
+
+Public GET routes are served here on Motor, so a request awaits Mongo
+instead of holding a worker thread, and independent lookups run
+concurrently. Everything else (admin, rep login/dashboard, registration,
+every POST) is forwarded to the existing Flask app unchanged.
+
+    uvicorn asgi:application --workers 2
+
+Templates, URLs and the session cookie are shared with the Flask app.
+"""
+import asyncio
+from asgiref.wsgi import WsgiToAsgi
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from itsdangerous import BadSignature
+from jinja2 import Environment, select_autoescape
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse
+from starlette.routing import Match, Route
+
+import app as flask_module
+import utils
+
+flask_app = flask_module.app
+
+# same database the Flask app uses (MONGO_DB)
+DB_NAME = flask_module.MONGO_DB
+MAX_POOL_SIZE = 200
+
+templates = Environment(loader=flask_app.jinja_loader, autoescape=select_autoescape(['html']))
+
+_state = {}
+
+def get_db():
+    return _state['db']
+
+async def startup():
+    # Motor binds to the running loop, so the client is created per process on startup
+    client = AsyncIOMotorClient(flask_module.MONGO_URI, maxPoolSize=MAX_POOL_SIZE)
+    _state['client'] = client
+    _state['db'] = client[DB_NAME]
+
+async def shutdown():
+    client = _state.pop('client', None)
+    if client:
+        client.close()
+
+# Session / template glue (mirrors what Flask injects into templates)
+
+def url_for(endpoint, **values):
+    # every public and admin endpoint is registered on the Flask url_map
+    return flask_app.url_map.bind('').build(endpoint, values)
+
+def asset_url(name):
+    hashed = flask_module.ASSET_MANIFEST.get(name)
+    return url_for('built_asset', filename=hashed) if hashed else None
+
+def _serializer():
+    return flask_app.session_interface.get_signing_serializer(flask_app)
+
+def load_session(request):
+    cookie = request.cookies.get(flask_app.session_interface.get_cookie_name(flask_app))
+    if not cookie:
+        return {}
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return dict(_serializer().loads(cookie, max_age=max_age))
+    except BadSignature:
+        return {}
+
+def save_session(response, session):
+    # same cookie Flask's SecureCookieSessionInterface.save_session would set
+    interface = flask_app.session_interface
+    name = interface.get_cookie_name(flask_app)
+    attrs = {
+        'domain': interface.get_cookie_domain(flask_app),
+        'path': interface.get_cookie_path(flask_app),
+        'secure': interface.get_cookie_secure(flask_app),
+        'httponly': interface.get_cookie_httponly(flask_app),
+        'samesite': interface.get_cookie_samesite(flask_app),
+    }
+    if session:
+        expires = interface.get_expiration_time(flask_app, interface.session_class(session))
+        response.set_cookie(name, _serializer().dumps(session), expires=expires, **attrs)
+    else:
+        response.delete_cookie(name, **attrs)
+    response.headers.append('Vary', 'Cookie')
+
+def render(request, template, **context):
+    session = load_session(request)
+    flashes = session.pop('_flashes', [])
+
+    def get_flashed_messages(with_categories=False):
+        return flashes if with_categories else [m for _, m in flashes]
+
+    html = templates.get_template(template).render(
+        session=session, get_flashed_messages=get_flashed_messages,
+        url_for=url_for, asset_url=asset_url, **context)
+    response = HTMLResponse(html)
+    if flashes:
+        # flashes were consumed, persist the session without them
+        save_session(response, session)
+    return response
+
+def flash_redirect(request, message, category, endpoint):
+    session = load_session(request)
+    session.setdefault('_flashes', []).append((category, message))
+    response = RedirectResponse(url_for(endpoint), status_code=302)
+    save_session(response, session)
+    return response
+
+def object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+# Routes (same paths and templates as app.py)
+
+async def index(request):
+    teams = await get_db().teams.find().sort('created_at', 1).to_list(None)
+    return render(request, 'index.html', teams=teams)
+
+async def list_teams(request):
+    teams = await get_db().teams.find().sort('rating', -1).to_list(None)
+    return render(request, 'teams.html', teams=teams)
+
+async def show_bracket(request):
+    matches = await get_db().matches.find().sort('created_at', 1).to_list(None)
+    return render(request, 'bracket.html', matches=matches)
+
+async def match_view(request):
+    db = get_db()
+    match_id = object_id(request.path_params['match_id'])
+    match = await db.matches.find_one({'_id': match_id}) if match_id else None
+    if not match:
+        return flash_redirect(request, 'Match not found', 'error', 'show_bracket')
+    t1, t2 = await asyncio.gather(
+        db.teams.find_one({'_id': match['team1']}),
+        db.teams.find_one({'_id': match['team2']}),
+    )
+    return render(request, 'match.html', match=match, team1=t1, team2=t2)
+
+async def players(request):
+    q = request.query_params.get('q', '')
+    return render(request, 'players.html', players=await search_players(q, limit=50), q=q)
+
+async def player_view(request):
+    player_id = object_id(request.path_params['player_id'])
+    player = await get_db().players.find_one({'_id': player_id}) if player_id else None
+    if not player:
+        return flash_redirect(request, 'Player not found', 'error', 'players')
+    return render(request, 'player.html', player=player)
+
+async def api_players_search(request):
+    q = request.query_params.get('q', '')
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, 100))
+    results = await search_players(q, limit=limit)
+    return JSONResponse([utils.player_summary(p) for p in results])
+
+async def analytics(request):
+    db = get_db()
+    teams, standings = await asyncio.gather(
+        db.teams.find().sort('created_at', 1).to_list(None),
+        db.standings.find().to_list(None),
+    )
+    # standings are kept up to date from the match event log (events.py)
+    stats = utils.team_stats_rows(teams, standings)
+    enriched = [{'country': t['country'], 'rating': t['rating'], 'stats': s} for t, s in zip(teams, stats)]
+    return render(request, 'analytics.html', teams=enriched)
+
+async def history(request):
+    tours = await get_db().tournaments.find().sort('played_at', -1).to_list(None)
+    return render(request, 'history.html', tournaments=tours)
+
+async def leaderboard(request):
+    cursor = get_db().players.find(utils.TOP_SCORERS_QUERY).sort(utils.TOP_SCORERS_SORT).limit(20)
+    scorers = utils.scorer_rows(await cursor.to_list(None))
+    return render(request, 'leaderboard.html', scorers=scorers)
+
+async def search_players(prefix, limit=20):
+    query = utils.player_search_query(prefix)
+    if query is None:
+        return []
+    return await get_db().players.find(query).sort('name_lower', 1).limit(limit).to_list(None)
+
+public = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/teams', list_teams),
+        Route('/bracket', show_bracket),
+        Route('/match/{match_id}', match_view),
+        Route('/players', players),
+        Route('/player/{player_id}', player_view),
+        Route('/api/players/search', api_players_search),
+        Route('/analytics', analytics),
+        Route('/history', history),
+        Route('/leaderboard', leaderboard),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
+
+flask_asgi = WsgiToAsgi(flask_app)
+
+def is_public(scope):
+    """True when the async surface has a GET/HEAD route for this request."""
+    if scope.get('method') not in ('GET', 'HEAD'):
+        return False
+    return any(route.matches(scope)[0] == Match.FULL for route in public.routes)
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await public(scope, receive, send)
+    elif scope['type'] == 'http' and is_public(scope):
+        await public(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
@@ -0,0 +1,580 @@
+"""Route-level load and regression benchmarks for the ANLeague app.
+
+Seeds a throwaway database (a local mongod, or mongomock for quick micro
+runs), drives every route in app.py through the Flask test client and a
+concurrent HTTP load generator, and compares the numbers against a stored
+baseline so regressions fail the run.
+
+    python bench.py --backend mongomock
+    python bench.py --mongo-uri mongodb://localhost:27017 --teams 200 --matches 2000
+    python bench.py --save-baseline          # write bench_baseline.json
+    python bench.py --compare                # exit 1 on regressions
+
+Query counts and failed requests are deterministic and are the hard gate.
+Latency is compared on p50 only, for routes with at least MIN_GATED_SAMPLES
+requests per run; for the test-client routes that is the best p50 over
+--repeat freshly seeded runs, since noise only ever adds time. Slowdowns
+are reported, and fail the run only with --gate-latency (use it on a quiet
+machine; shared VMs swing well past any useful tolerance). Tail
+percentiles are reported, not compared.
+    python bench.py --asgi --concurrency 512 # Flask vs asgi.py side by side
+
+Extra dependencies for micro runs are listed in requirements-bench.txt.
+"""
+import os
+import sys
+import json
+import logging
+import math
+import statistics
+import time
+import random
+import argparse
+import contextlib
+import itertools
+import threading
+import timeit
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# commands that are driver housekeeping rather than queries issued by a route
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'buildInfo', 'saslStart', 'saslContinue'}
+# below this many requests per run a route's latency is too noisy to gate on
+MIN_GATED_SAMPLES = 20
+MONGOMOCK_OPS = ('find', 'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many',
+                 'delete_one', 'delete_many', 'count_documents', 'bulk_write', 'aggregate', 'create_index')
+
+
+class QueryCounter:
+    """Counts database round-trips; fed by pymongo monitoring or mongomock patches."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def incr(self):
+        with self._lock:
+            self.count += 1
+
+    def install_pymongo(self):
+        from pymongo import monitoring
+        counter = self
+
+        class Listener(monitoring.CommandListener):
+            def started(self, event):
+                if event.command_name not in IGNORED_COMMANDS:
+                    counter.incr()
+
+            def succeeded(self, event):
+                pass
+
+            def failed(self, event):
+                pass
+
+        # must happen before any MongoClient is created
+        monitoring.register(Listener())
+
+    def install_mongomock(self):
+        import mongomock.collection
+        counter = self
+        for name in MONGOMOCK_OPS:
+            orig = getattr(mongomock.collection.Collection, name)
+
+            def wrapped(self, *args, _orig=orig, **kwargs):
+                # mongomock calls find() from find_one() etc; only count the outermost call
+                depth = getattr(counter._local, 'depth', 0)
+                if depth == 0:
+                    counter.incr()
+                counter._local.depth = depth + 1
+                try:
+                    return _orig(self, *args, **kwargs)
+                finally:
+                    counter._local.depth = depth
+            setattr(mongomock.collection.Collection, name, wrapped)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def merge_runs(runs):
+    """Combine repeated route runs: median of each percentile, worst case for queries and errors."""
+    merged = {}
+    for name in runs[0]:
+        rows = [run[name] for run in runs]
+        out = {'n': rows[0]['n'], 'runs': len(rows)}
+        for key in ('p50', 'p95', 'p99'):
+            out[key] = statistics.median(r[key] for r in rows)
+        # what the latency gate compares (see compare)
+        out['p50_best'] = min(r['p50'] for r in rows)
+        out['queries'] = max(r['queries'] for r in rows)
+        out['errors'] = sum(r['errors'] for r in rows)
+        merged[name] = out
+    return merged
+
+
+def summarize(latencies_ms, wall_s=None):
+    out = {
+        'n': len(latencies_ms),
+        'p50': percentile(latencies_ms, 50),
+        'p95': percentile(latencies_ms, 95),
+        'p99': percentile(latencies_ms, 99),
+    }
+    if wall_s:
+        out['rps'] = round(len(latencies_ms) / wall_s, 1)
+    return out
+
+
+def load_app(args, counter):
+    """Import app.py against the benchmark backend and database."""
+    os.environ['MONGO_URI'] = args.mongo_uri
+    # app.py bootstraps (admin user, indexes, migrations) on import; keep that
+    # off the real database
+    os.environ['MONGO_DB'] = args.db_name
+    # keep simulations offline and notifications in the log
+    os.environ['OPENAI_API_KEY'] = ''
+    os.environ['SMTP_HOST'] = ''
+    if args.backend == 'mongomock':
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        counter.install_mongomock()
+    else:
+        counter.install_pymongo()
+        # start from an empty bench database so the import-time migrations have nothing to do
+        import pymongo
+        pymongo.MongoClient(args.mongo_uri).drop_database(args.db_name)
+    import app as app_module
+    import utils
+    app_module.app.logger.disabled = True
+    return app_module, utils
+
+
+def reset_db(app_module, utils):
+    """Empty the bench database and recreate the indexes app.py sets up on import."""
+    app_module.client.drop_database(app_module.MONGO_DB)
+    utils.ensure_player_indexes(app_module.db)
+    app_module.events.ensure_event_indexes(app_module.db)
+
+
+def seed(app_module, utils, args):
+    """Populate the bench database with teams, played matches and tournaments."""
+    from werkzeug.security import generate_password_hash
+    import events
+    db = app_module.db
+    rnd = random.Random(args.seed)
+    random.seed(args.seed)
+    db.users.insert_one({'username': 'bench_admin', 'password': generate_password_hash('bench'), 'role': 'admin'})
+    teams = []
+    for i in range(args.teams):
+        team = utils.demo_team(utils.AFRICAN_COUNTRIES[i % len(utils.AFRICAN_COUNTRIES)])
+        team['rep_email'] = f'rep{i}@bench.example.com'
+        db.teams.insert_one(team)
+        utils.register_team_players(db, team)
+        teams.append(team)
+    db.users.insert_one({'username': teams[0]['rep_email'], 'password': generate_password_hash('bench'),
+                         'role': 'rep', 'team_id': teams[0]['_id']})
+    start = datetime.utcnow() - timedelta(days=1)
+    matches = []
+    results = []
+    for i in range(args.matches):
+        t1, t2 = rnd.sample(teams, 2)
+        result = utils.simulate_match(t1, t2)
+        m = {
+            'team1': t1['_id'], 'team2': t2['_id'],
+            'team1_country': t1['country'], 'team2_country': t2['country'],
+            'stage': 'Quarterfinal', 'played': False, 'score1': None, 'score2': None, 'scorers': [],
+            'commentary': result['commentary'],
+            'created_at': start + timedelta(seconds=i),
+        }
+        db.matches.insert_one(m)
+        results.append((m, result['events']))
+        matches.append(m)
+    # results reach the matches, players and standings through the event log, as in the app
+    events.log_matches(db, results)
+    events.consume(db)
+    for i in range(args.tournaments):
+        w = rnd.choice(teams)
+        db.tournaments.insert_one({'winner_id': w['_id'], 'winner_country': w['country'],
+                                   'played_at': start + timedelta(minutes=i)})
+    player = db.players.find_one({'goals': {'$gt': 0}}) or db.players.find_one()
+    return {'teams': teams, 'matches': matches, 'player_id': player['_id']}
+
+
+def session_cookie(flask_app, data):
+    """Signed Flask session cookie value, so HTTP clients can hit authenticated routes."""
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    return serializer.dumps(data)
+
+
+def build_routes(app_module, utils, state):
+    """Every route in app.py as (name, method, auth, request_factory, iterations scale)."""
+    db = app_module.db
+    first = state['teams'][0]
+    admin = {'user': {'username': 'bench_admin', 'role': 'admin'}}
+    rep = {'rep': {'username': first['rep_email'], 'role': 'rep', 'team_id': str(first['_id'])}}
+    counter = itertools.count()
+
+    def fixed(path, data=None):
+        return lambda: (path, data)
+
+    def unplayed_match():
+        t1, t2 = state['teams'][0], state['teams'][1]
+        m = {'team1': t1['_id'], 'team2': t2['_id'], 'team1_country': t1['country'],
+             'team2_country': t2['country'], 'stage': 'Quarterfinal', 'score1': None, 'score2': None,
+             'scorers': [], 'played': False, 'created_at': datetime.utcnow()}
+        db.matches.insert_one(m)
+        return m
+
+    def simulate_one():
+        return f'/admin/simulate/{unplayed_match()["_id"]}', None
+
+    def simulate_all():
+        for _ in range(4):
+            unplayed_match()
+        return '/admin/simulate_all', None
+
+    def throwaway_team():
+        team = utils.demo_team()
+        db.teams.insert_one(team)
+        utils.register_team_players(db, team)
+        return team['_id']
+
+    def register_post():
+        n = next(counter)
+        return '/register', {'country': 'Ghana', 'rep_name': 'Bench Rep', 'rep_email': f'bench{n}@example.com',
+                             'manager': 'Bench Manager', 'autofill': 'on', 'rep_password': 'bench'}
+
+    match_id = state['matches'][0]['_id'] if state['matches'] else unplayed_match()['_id']
+    # built_asset only exists once build_assets.py has produced a manifest
+    assets = []
+    if app_module.ASSET_MANIFEST.get('app.css'):
+        assets.append(('built_asset', 'GET', None, fixed(f"/assets/{app_module.ASSET_MANIFEST['app.css']}"), 1))
+    # reads first (stable seeded state), writes after, reset last since it clears matches
+    return assets + [
+        ('index', 'GET', None, fixed('/'), 1),
+        ('register_form', 'GET', None, fixed('/register'), 1),
+        ('list_teams', 'GET', None, fixed('/teams'), 1),
+        ('show_bracket', 'GET', None, fixed('/bracket'), 1),
+        ('match_view', 'GET', None, fixed(f'/match/{match_id}'), 1),
+        ('players', 'GET', None, fixed('/players?q=ko'), 1),
+        ('player_view', 'GET', None, fixed(f'/player/{state["player_id"]}'), 1),
+        ('api_players_search', 'GET', None, fixed('/api/players/search?q=jo'), 1),
+        ('analytics', 'GET', None, fixed('/analytics'), 1),
+        ('history', 'GET', None, fixed('/history'), 1),
+        ('leaderboard', 'GET', None, fixed('/leaderboard'), 1),
+        ('admin_login_form', 'GET', None, fixed('/admin/login'), 1),
+        ('rep_login_form', 'GET', None, fixed('/rep/login'), 1),
+        ('rep_dashboard', 'GET', rep, fixed('/rep/dashboard'), 1),
+        ('admin_dashboard', 'GET', admin, fixed('/admin'), 1),
+        ('admin_logout', 'GET', admin, fixed('/admin/logout'), 1),
+        ('rep_logout', 'GET', rep, fixed('/rep/logout'), 1),
+        ('admin_login', 'POST', None, fixed('/admin/login', {'username': 'bench_admin', 'password': 'bench'}), 0.2),
+        ('rep_login', 'POST', None, fixed('/rep/login', {'username': first['rep_email'], 'password': 'bench'}), 0.2),
+        ('register', 'POST', None, register_post, 0.2),
+        ('admin_seed', 'POST', admin, fixed('/admin/seed'), 0.2),
+        ('admin_add_eighth', 'POST', admin, fixed('/admin/add_eighth'), 0.2),
+        ('admin_create_rep_users', 'POST', admin, fixed('/admin/create_rep_users'), 0.2),
+        ('admin_remove_team', 'POST', admin, lambda: (f'/admin/remove_team/{throwaway_team()}', None), 0.2),
+        ('admin_replace_team', 'POST', admin, lambda: (f'/admin/replace_team/{throwaway_team()}', None), 0.2),
+        ('admin_start', 'POST', admin, fixed('/admin/start'), 0.2),
+        ('admin_simulate', 'POST', admin, simulate_one, 0.5),
+        ('admin_simulate_all', 'POST', admin, simulate_all, 0.2),
+        ('admin_email', 'POST', admin, fixed('/admin/email'), 0.2),
+        ('admin_reset', 'POST', admin, fixed('/admin/reset'), 0.1),
+    ]
+
+
+def run_test_client(app_module, routes, counter, iterations):
+    """Sequential per-route latency and query counts through the Flask test client."""
+    results = {}
+    for name, method, auth, factory, scale in routes:
+        n = max(3, int(iterations * scale))
+        latencies = []
+        queries = []
+        errors = 0
+        for _ in range(n):
+            path, data = factory()
+            client = app_module.app.test_client()
+            if auth:
+                with client.session_transaction() as sess:
+                    sess.update(auth)
+            before = counter.count
+            t0 = time.perf_counter()
+            resp = client.open(path, method=method, data=data)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            queries.append(counter.count - before)
+            if resp.status_code >= 400:
+                errors += 1
+        stats = summarize(latencies)
+        stats['queries'] = max(queries)
+        stats['errors'] = errors
+        results[name] = stats
+    return results
+
+
+@contextlib.contextmanager
+def serve_flask(app_module):
+    """Threaded werkzeug server for the sync Flask app; yields the base URL."""
+    from werkzeug.serving import make_server
+    # app.logger.disabled does not cover werkzeug's per-request access log
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+
+
+@contextlib.contextmanager
+def serve_asgi(args):
+    """uvicorn serving asgi.application (Motor read path) in a background thread."""
+    import socket
+    import uvicorn
+    import asgi
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(asgi.application, host='127.0.0.1', port=port, log_level='warning',
+                            backlog=max(2048, args.concurrency * 2))
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def run_load(app_module, routes, concurrency, requests_per_route, server, only=None):
+    """Concurrent HTTP load against a running server, GET routes only."""
+    cookie_name = app_module.app.config.get('SESSION_COOKIE_NAME', 'session')
+    results = {}
+    with server as base:
+        for name, method, auth, factory, _ in routes:
+            if method != 'GET' or name.endswith('_logout'):
+                continue
+            if only is not None and name not in only:
+                continue
+            path, _ = factory()
+            headers = {}
+            if auth:
+                headers['Cookie'] = f'{cookie_name}={session_cookie(app_module.app, auth)}'
+            errors = []
+
+            def hit(_):
+                req = urllib.request.Request(base + path, headers=headers)
+                t0 = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(req) as resp:
+                        resp.read()
+                except urllib.error.URLError:
+                    errors.append(1)
+                return (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(hit, range(requests_per_route)))
+            stats = summarize(latencies, time.perf_counter() - t0)
+            stats['errors'] = len(errors)
+            results[name] = stats
+    return results
+
+
+def asgi_routes(routes):
+    """Names of the GET routes that asgi.application serves itself rather than forwarding to Flask."""
+    import asgi
+    names = set()
+    for name, method, _, factory, _ in routes:
+        path = factory()[0].split('?')[0]
+        if method == 'GET' and asgi.is_public({'type': 'http', 'method': 'GET', 'path': path, 'root_path': ''}):
+            names.add(name)
+    return names
+
+
+def run_micro(iterations):
+    """Microbenchmarks for the simulation helpers in utils (mean microseconds per call)."""
+    import utils
+    from bson.objectid import ObjectId
+    random.seed(0)
+    teams = []
+    for i in range(8):
+        team = utils.demo_team(utils.AFRICAN_COUNTRIES[i])
+        team['_id'] = ObjectId()
+        teams.append(team)
+    players = teams[0]['players']
+    cases = {
+        'poisson_random': lambda: utils.poisson_random(1.5),
+        'choose_scorer': lambda: utils.choose_scorer(players),
+        'make_bracket': lambda: utils.make_bracket(teams),
+        'simulate_match': lambda: utils.simulate_match(teams[0], teams[1]),
+    }
+    results = {}
+    for name, fn in cases.items():
+        n = iterations if name != 'simulate_match' else max(1, iterations // 10)
+        best = min(timeit.repeat(fn, number=n, repeat=3))
+        results[name] = {'us_per_call': round(best / n * 1e6, 3)}
+    return results
+
+
+def compare(current, baseline, tolerance, noise_ms):
+    """Return (regressions, slowdowns) of current vs baseline as human-readable lines.
+
+    Regressions are query count increases, failed requests and scale
+    mismatches; slowdowns are p50 and micro timings past the tolerance.
+    """
+    problems = []
+    slowdowns = []
+    if baseline.get('scale') != current.get('scale'):
+        problems.append(f"scale mismatch: baseline {baseline.get('scale')} vs current {current.get('scale')}")
+        return problems, slowdowns
+    for section in ('routes', 'load', 'load_asgi'):
+        for name, cur in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            # deterministic, so any increase is a regression
+            if 'queries' in base and cur.get('queries', 0) > base['queries']:
+                problems.append(f"{section}/{name} queries: {cur['queries']} > baseline {base['queries']}")
+            if cur.get('errors'):
+                problems.append(f"{section}/{name}: {cur['errors']} failed requests")
+            if min(base.get('n', 0), cur.get('n', 0)) < MIN_GATED_SAMPLES:
+                continue
+            key = 'p50_best' if 'p50_best' in base and 'p50_best' in cur else 'p50'
+            if base.get(key) is not None and cur.get(key) is not None:
+                if cur[key] > base[key] * (1 + tolerance) and cur[key] - base[key] > noise_ms:
+                    slowdowns.append(f'{section}/{name} {key}: {cur[key]:.2f}ms > baseline {base[key]:.2f}ms')
+    for name, cur in current.get('micro', {}).items():
+        base = baseline.get('micro', {}).get(name)
+        if base and cur['us_per_call'] > base['us_per_call'] * (1 + tolerance):
+            slowdowns.append(f"micro/{name}: {cur['us_per_call']}us > baseline {base['us_per_call']}us")
+    return problems, slowdowns
+
+
+def print_report(report):
+    def fmt(v):
+        return '-' if v is None else (f'{v:.2f}' if isinstance(v, float) else str(v))
+    for section in ('routes', 'load', 'load_asgi'):
+        rows = report.get(section)
+        if not rows:
+            continue
+        print(f'\n== {section} ==')
+        print(f"{'route':<24}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'rps':>10}{'queries':>9}{'errors':>8}")
+        for name, s in rows.items():
+            print(f"{name:<24}{s['n']:>6}{fmt(s['p50']):>10}{fmt(s['p95']):>10}{fmt(s['p99']):>10}"
+                  f"{fmt(s.get('rps')):>10}{fmt(s.get('queries')):>9}{fmt(s.get('errors')):>8}")
+    if report.get('load_asgi'):
+        print('\n== flask vs asgi (same routes, same concurrency) ==')
+        print(f"{'route':<24}{'flask p95':>12}{'asgi p95':>12}{'flask rps':>12}{'asgi rps':>12}")
+        for name, a in report['load_asgi'].items():
+            f = report.get('load', {}).get(name, {})
+            print(f"{name:<24}{fmt(f.get('p95')):>12}{fmt(a['p95']):>12}{fmt(f.get('rps')):>12}{fmt(a.get('rps')):>12}")
+    if report.get('micro'):
+        print('\n== micro (us/call) ==')
+        for name, s in report['micro'].items():
+            print(f"{name:<24}{s['us_per_call']:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--backend', choices=['mongod', 'mongomock'], default='mongod')
+    parser.add_argument('--mongo-uri', default=os.getenv('BENCH_MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default='anleague_bench', help='dropped and reseeded on every run')
+    parser.add_argument('--teams', type=int, default=16)
+    parser.add_argument('--matches', type=int, default=64)
+    parser.add_argument('--tournaments', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=50, help='test-client requests per read route')
+    parser.add_argument('--repeat', type=int, default=3, help='route runs, each on a freshly seeded database')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='HTTP requests per route in the load phase')
+    parser.add_argument('--micro-iterations', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--skip-routes', action='store_true')
+    parser.add_argument('--asgi', action='store_true',
+                        help='also load-test asgi.application side by side with Flask (needs a real mongod)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--noise-ms', type=float, default=1.0, help='ignore latency deltas below this')
+    parser.add_argument('--gate-latency', action='store_true', help='also fail --compare on latency slowdowns')
+    args = parser.parse_args(argv)
+    if args.teams < 2:
+        parser.error('--teams must be at least 2')
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    if args.asgi and (args.backend != 'mongod' or args.skip_load):
+        parser.error('--asgi needs --backend mongod and the load phase')
+
+    report = {
+        'scale': {'backend': args.backend, 'teams': args.teams, 'matches': args.matches,
+                  'tournaments': args.tournaments},
+        'micro': run_micro(args.micro_iterations),
+    }
+    if not args.skip_routes:
+        counter = QueryCounter()
+        app_module, utils = load_app(args, counter)
+        reset_db(app_module, utils)
+        state = seed(app_module, utils, args)
+        # load phase runs on the seeded state, before write routes mutate it
+        if not args.skip_load:
+            routes = build_routes(app_module, utils, state)
+            report['load'] = run_load(app_module, routes, args.concurrency, args.requests, serve_flask(app_module))
+            if args.asgi:
+                report['load_asgi'] = run_load(app_module, routes, args.concurrency, args.requests,
+                                               serve_asgi(args), only=asgi_routes(routes))
+        runs = []
+        for i in range(args.repeat):
+            if i:
+                # write routes grow the data, so every run starts from the same seed
+                reset_db(app_module, utils)
+                state = seed(app_module, utils, args)
+            runs.append(run_test_client(app_module, build_routes(app_module, utils, state), counter, args.iterations))
+        report['routes'] = merge_runs(runs)
+        app_module.client.drop_database(args.db_name)
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f'\nBaseline written to {args.baseline}')
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f'\nNo baseline at {args.baseline}; run with --save-baseline first')
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems, slowdowns = compare(report, baseline, args.tolerance, args.noise_ms)
+        if slowdowns:
+            print('\nSLOWER THAN BASELINE' + ('' if args.gate_latency else ' (not gated, see --gate-latency)') + ':')
+            for s in slowdowns:
+                print('  ' + s)
+        if args.gate_latency:
+            problems += slowdowns
+        if problems:
+            print('\nREGRESSIONS:')
+            for p in problems:
+                print('  ' + p)
+            return 1
+        print('\nNo regressions against baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
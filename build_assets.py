@@ -0,0 +1,127 @@
+"""Build self-hosted front-end assets into static/dist.
+
+    python build_assets.py             # purged Tailwind CSS + vendored JS, hashed and precompressed
+    python build_assets.py --fetch     # download pinned vendor files into static/vendor first
+
+Deploys run the --fetch form as the Vercel build command (vercel.json), so
+static/dist is produced at build time rather than committed.
+
+Needs the Tailwind CLI (standalone `tailwindcss` binary or `npx tailwindcss`).
+Brotli output is written when the `brotli` package is installed, gzip always.
+The app serves whatever static/dist/manifest.json points at; without it the
+templates fall back to the CDN builds.
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+import tempfile
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC = os.path.join(ROOT, 'static')
+DIST = os.path.join(STATIC, 'dist')
+VENDOR = os.path.join(STATIC, 'vendor')
+
+# logical name -> (vendored file, pinned source URL)
+VENDOR_FILES = {
+    'chart.js': ('chart.umd.min.js', 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js'),
+}
+# logical name -> file under static/, copied as is
+APP_FILES = {
+    'match.js': 'match.js',
+}
+
+
+def fetch_vendor():
+    os.makedirs(VENDOR, exist_ok=True)
+    for name, (filename, url) in VENDOR_FILES.items():
+        print(f'fetching {name} from {url}')
+        with urllib.request.urlopen(url) as resp:
+            data = resp.read()
+        with open(os.path.join(VENDOR, filename), 'wb') as f:
+            f.write(data)
+
+
+def tailwind_command():
+    if shutil.which('tailwindcss'):
+        return ['tailwindcss']
+    if shutil.which('npx'):
+        return ['npx', '--yes', 'tailwindcss@3']
+    raise RuntimeError('Tailwind CLI not found; install the standalone tailwindcss binary or Node.js')
+
+
+def build_css():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'app.css')
+        cmd = tailwind_command() + ['-c', os.path.join(ROOT, 'tailwind.config.js'),
+                                    '-i', os.path.join(STATIC, 'src', 'app.css'), '-o', out, '--minify']
+        subprocess.run(cmd, cwd=ROOT, check=True)
+        with open(out, 'rb') as f:
+            return f.read()
+
+
+def hashed_name(name, data):
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return f'{stem}.{digest}{ext}'
+
+
+def write_asset(name, data):
+    """Write the hashed file plus .gz/.br siblings; returns the hashed filename."""
+    filename = hashed_name(name, data)
+    path = os.path.join(DIST, filename)
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the gzip output reproducible between builds
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+    return filename
+
+
+def build():
+    if os.path.isdir(DIST):
+        shutil.rmtree(DIST)
+    os.makedirs(DIST)
+    manifest = {'app.css': write_asset('app.css', build_css())}
+    for name, (filename, url) in VENDOR_FILES.items():
+        path = os.path.join(VENDOR, filename)
+        if not os.path.exists(path):
+            raise RuntimeError(f'{path} missing; run with --fetch to download {url}')
+        with open(path, 'rb') as f:
+            manifest[name] = write_asset(name, f.read())
+    for name, filename in APP_FILES.items():
+        with open(os.path.join(STATIC, filename), 'rb') as f:
+            manifest[name] = write_asset(name, f.read())
+    with open(os.path.join(DIST, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        print('brotli not installed - only gzip variants written')
+    for name, filename in sorted(manifest.items()):
+        print(f'{name} -> static/dist/{filename}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build hashed, precompressed front-end assets.')
+    parser.add_argument('--fetch', action='store_true', help='download pinned vendor files first')
+    args = parser.parse_args(argv)
+    if args.fetch:
+        fetch_vendor()
+    build()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
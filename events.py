@@ -0,0 +1,363 @@
+"""Append-only match event log and the materialized views derived from it.
+
+simulate_match() emits typed events (kickoff, goal, et_start, penalty,
+full_time). They are appended in batches to db.match_events using a
+compact encoding and are never updated; each event gets a log position `q`
+from a counter in db.counters, so log order is the same for every writer.
+Match scores/scorers, player stats
+and team standings are derived from the log by a resumable consumer that
+keeps its position in db.event_checkpoints, so a new stat can be
+backfilled by replaying events instead of re-simulating. Matches played
+before the log existed are written into it once by backfill_match_events
+(migrate.py), so a rebuild never loses them.
+
+    python events.py              # catch the views up with the log
+    python events.py --rebuild    # reset the views and replay every event
+"""
+import re
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError, PyMongoError
+
+import utils
+
+EVENT_TYPES = ('kickoff', 'goal', 'et_start', 'penalty', 'full_time')
+TYPE_CODES = {t: i for i, t in enumerate(EVENT_TYPES)}
+
+# event field -> short key stored in db.match_events
+FIELDS = {
+    'side': 'k',
+    'player_id': 'p',
+    'player': 'pn',
+    'gif': 'g',
+    'scored': 'ok',
+    'winner': 'w',
+}
+
+VIEWS_CONSUMER = 'views'
+SEQUENCE_ID = 'match_events'
+
+PENALTIES_RE = re.compile(r'Penalties (\d+)-(\d+)\.')
+
+# a hole in the log positions is normally a writer between reserving and
+# inserting; one this old is taken to be a writer that died in between
+GAP_TIMEOUT = timedelta(seconds=30)
+APPEND_RETRIES = 3
+WAIT_INTERVAL = 0.05
+
+
+def ensure_event_indexes(db):
+    db.match_events.create_index([('m', ASCENDING), ('s', ASCENDING)], unique=True)
+    db.match_events.create_index('q', unique=True)
+
+
+# Encoding
+
+def encode_event(match_id, seq, event, ts):
+    doc = {'m': match_id, 's': seq, 't': TYPE_CODES[event['type']], 'n': event['minute'], 'ts': ts}
+    for field, key in FIELDS.items():
+        if event.get(field) is not None:
+            doc[key] = event[field]
+    return doc
+
+
+def decode_event(doc):
+    event = {
+        'position': doc['q'],
+        'match_id': doc['m'],
+        'seq': doc['s'],
+        'type': EVENT_TYPES[doc['t']],
+        'minute': doc['n'],
+        'ts': doc['ts'],
+    }
+    for field, key in FIELDS.items():
+        if key in doc:
+            event[field] = doc[key]
+    return event
+
+
+# Writing
+
+def match_event_docs(match_id, events, ts):
+    return [encode_event(match_id, i, e, ts) for i, e in enumerate(events)]
+
+
+def append_events(db, docs):
+    """Reserve a block of log positions for docs, then insert them.
+
+    A failed insert is retried with the same _ids and positions; docs that
+    already made it in come back as duplicate keys and are skipped, so a
+    retry neither duplicates an event nor leaves a hole in the log.
+    Returns the last position written (None when there was nothing to write).
+    """
+    if not docs:
+        return None
+    counter = db.counters.find_one_and_update({'_id': SEQUENCE_ID}, {'$inc': {'seq': len(docs)}},
+                                              upsert=True, return_document=ReturnDocument.AFTER)
+    first = counter['seq'] - len(docs) + 1
+    for i, doc in enumerate(docs):
+        doc['q'] = first + i
+        doc.setdefault('_id', ObjectId())
+    for attempt in range(1, APPEND_RETRIES + 1):
+        try:
+            db.match_events.insert_many(docs, ordered=False)
+            return counter['seq']
+        except BulkWriteError as exc:
+            if all(err['code'] == 11000 for err in exc.details.get('writeErrors', [])):
+                return counter['seq']
+            if attempt == APPEND_RETRIES:
+                raise
+        except PyMongoError:
+            if attempt == APPEND_RETRIES:
+                raise
+        time.sleep(0.1 * attempt)
+
+
+def log_matches(db, results, ts=None):
+    """Append the events of simulated matches, at most once per match.
+
+    results is a list of (match, events). Each match is claimed by setting
+    events_logged first, so a match that is already in the log (played,
+    double submitted, or simulated by two admins at once) is left out.
+    Returns the ids of the matches that were logged and the log position of
+    their last event, for consume(until=...).
+
+    Claims are never released: once positions are reserved some events
+    may already be in the log and applied, so a match whose append keeps
+    failing stays claimed rather than being simulated (and counted) again.
+    """
+    ts = ts or datetime.utcnow()
+    logged = []
+    docs = []
+    for match, match_events in results:
+        claim = db.matches.update_one({'_id': match['_id'], 'events_logged': {'$ne': True}}, {'$set': {'events_logged': True}})
+        if claim.modified_count:
+            logged.append(match['_id'])
+            docs += match_event_docs(match['_id'], match_events, ts)
+    return set(logged), append_events(db, docs)
+
+
+def legacy_events(match, teams):
+    """Events rebuilt from a match doc stored before the event log.
+
+    Goals come from the saved scorers in minute order. Extra time is
+    inferred from a level score at 90 minutes or a goal after it, and the
+    shootout from the 'Penalties p1-p2.' note simulate_match leaves in the
+    commentary. Misses were never stored, so only scored kicks are logged.
+    """
+    squad1 = {p.get('player_id') for p in teams.get(match['team1'], {}).get('players', []) if p.get('player_id')}
+    goals = []
+    for s in sorted(match.get('scorers', []), key=lambda s: s.get('minute') or 0):
+        if s.get('team_country') in (match.get('team1_country'), match.get('team2_country')):
+            side = 1 if s['team_country'] == match.get('team1_country') else 2
+        else:
+            # team renamed since; fall back to squad membership
+            side = 1 if s.get('player_id') in squad1 else 2
+        goals.append({'type': 'goal', 'minute': s.get('minute') or 0, 'side': side,
+                      'player_id': s.get('player_id'), 'player': s.get('player'), 'gif': s.get('gif')})
+    regular = [g for g in goals if g['minute'] <= 90]
+    extra = [g for g in goals if g['minute'] > 90]
+    events = [{'type': 'kickoff', 'minute': 0}] + regular
+    extra_time = bool(extra) or sum(g['side'] == 1 for g in regular) == sum(g['side'] == 2 for g in regular)
+    if extra_time:
+        events.append({'type': 'et_start', 'minute': 90})
+        events += extra
+    score1 = sum(g['side'] == 1 for g in goals)
+    score2 = len(goals) - score1
+    if extra_time and score1 == score2:
+        found = PENALTIES_RE.search(match.get('commentary') or '')
+        if found:
+            p1, p2 = int(found.group(1)), int(found.group(2))
+            for i in range(max(p1, p2)):
+                events += [{'type': 'penalty', 'minute': 120, 'side': side, 'scored': True}
+                           for side, made in ((1, p1), (2, p2)) if i < made]
+    if match.get('winner') in (match['team1'], match['team2']):
+        winner = 1 if match['winner'] == match['team1'] else 2
+    else:
+        winner = 1 if score1 >= score2 else 2
+    events.append({'type': 'full_time', 'minute': 120 if extra_time else 90, 'winner': winner})
+    return events
+
+
+def backfill_match_events(db):
+    """Log the matches played before the event log, then rebuild the views from it.
+
+    Runs as a migration after utils.migrate_players, which gives legacy
+    scorers their player ids. Stats seeded from the match docs are replaced
+    by a full replay, so every played match is counted from the log alone.
+    """
+    teams = {t['_id']: t for t in db.teams.find()}
+    for m in db.matches.find({'played': True, 'events_logged': {'$ne': True}}).sort('created_at', 1):
+        log_matches(db, [(m, legacy_events(m, teams))], ts=m.get('played_at') or m.get('created_at'))
+    reset_views(db)
+    consume(db)
+
+
+# Consuming
+
+def consume(db, name=VIEWS_CONSUMER, apply=None, batch_size=500, until=None):
+    """Apply every event past the consumer's checkpoint, in log order.
+
+    Returns the number of events applied. Events are applied up to the
+    first missing position, so a batch still being inserted is picked up
+    by the next call instead of being skipped. With `until`, holes before
+    that position are waited out (a hole is skipped once older than
+    GAP_TIMEOUT), so it has been applied on return. A crash between
+    applying a batch and saving the checkpoint replays that batch, so
+    `apply` must be idempotent; the views consumer guards each update on
+    its own doc's last_event.
+    """
+    apply = apply or apply_to_views
+    checkpoint = db.event_checkpoints.find_one({'_id': name})
+    last_q = checkpoint.get('last_q', 0) if checkpoint else 0
+    total = 0
+    deadline = time.monotonic() + 2 * GAP_TIMEOUT.total_seconds()
+    while True:
+        batch = list(db.match_events.find({'q': {'$gt': last_q}}).sort('q', 1).limit(batch_size))
+        ready = _contiguous(batch, last_q)
+        if ready:
+            apply(db, [decode_event(d) for d in ready])
+            last_q = ready[-1]['q']
+            db.event_checkpoints.update_one({'_id': name}, {'$set': {'last_q': last_q, 'updated_at': datetime.utcnow()}}, upsert=True)
+            total += len(ready)
+        if len(ready) == len(batch) == batch_size:
+            continue
+        if until is None or last_q >= until or not batch or time.monotonic() > deadline:
+            break
+        # blocked by a hole before `until`: another writer is still inserting
+        time.sleep(WAIT_INTERVAL)
+    return total
+
+
+def _contiguous(docs, last_q):
+    # leading docs with no hole before them (see GAP_TIMEOUT)
+    now = datetime.now(timezone.utc)
+    ready = []
+    expected = last_q + 1
+    for doc in docs:
+        if doc['q'] != expected and now - doc['_id'].generation_time < GAP_TIMEOUT:
+            break
+        ready.append(doc)
+        expected = doc['q'] + 1
+    return ready
+
+
+def _not_applied(position):
+    # matches docs that have not seen this event yet (including docs with no last_event)
+    return {'last_event': {'$not': {'$gte': position}}}
+
+
+def apply_to_views(db, events):
+    """Fold a batch of events into match docs, player stats and standings.
+
+    The three collections are written one after the other, so after a crash
+    the match docs can be ahead of players and standings. Every update is
+    guarded on its own doc's last_event instead of the match's, which lets a
+    replay finish the collections that were not written yet.
+    """
+    match_ids = list({e['match_id'] for e in events})
+    matches = {m['_id']: m for m in db.matches.find({'_id': {'$in': match_ids}})}
+    match_ops = []
+    player_ops = []
+    standing_ops = []
+    for e in events:
+        m = matches.get(e['match_id'])
+        if m is None:
+            # match removed since the event was written
+            continue
+        # a match doc already past this event holds the scores it led to, so
+        # the in-memory copy is only advanced (and written) when it is not
+        fresh = not (m.get('last_event') and m['last_event'] >= e['position'])
+        if fresh:
+            m['last_event'] = e['position']
+        guard = dict({'_id': m['_id']}, **_not_applied(e['position']))
+        mark = {'last_event': e['position']}
+        kind = e['type']
+        if kind == 'kickoff':
+            reset = {'score1': 0, 'score2': 0, 'scorers': [], 'extra_time': False, 'penalty_kicks': [], 'played': False}
+            if fresh:
+                m.update(reset)
+                match_ops.append(UpdateOne(guard, {'$set': dict(reset, **mark), '$unset': {'penalties1': '', 'penalties2': ''}}))
+            player_ops.append(UpdateMany(dict({'team_id': {'$in': [m['team1'], m['team2']]}}, **_not_applied(e['position'])),
+                                         {'$inc': {'matches_played': 1}, '$set': mark}))
+        elif kind == 'goal':
+            side = e['side']
+            if fresh:
+                m[f'score{side}'] = (m.get(f'score{side}') or 0) + 1
+                scorer = {'team_country': m[f'team{side}_country'], 'player': e.get('player'), 'player_id': e.get('player_id'),
+                          'minute': e['minute'], 'gif': e.get('gif')}
+                match_ops.append(UpdateOne(guard, {'$inc': {f'score{side}': 1}, '$push': {'scorers': scorer}, '$set': mark}))
+            if e.get('player_id'):
+                player_ops.append(UpdateOne(dict({'_id': e['player_id']}, **_not_applied(e['position'])),
+                                            {'$inc': {'goals': 1}, '$push': {'goal_minutes': e['minute']}, '$set': mark}))
+        elif kind == 'et_start' and fresh:
+            match_ops.append(UpdateOne(guard, {'$set': dict({'extra_time': True}, **mark)}))
+        elif kind == 'penalty' and fresh:
+            side = e['side']
+            match_ops.append(UpdateOne(guard, {'$inc': {f'penalties{side}': 1 if e.get('scored') else 0},
+                                               '$push': {'penalty_kicks': {'side': side, 'scored': bool(e.get('scored'))}},
+                                               '$set': mark}))
+        elif kind == 'full_time':
+            if fresh:
+                m['played'] = True
+                match_ops.append(UpdateOne(guard, {'$set': dict({'played': True, 'winner': m[f"team{e['winner']}"], 'played_at': e['ts']}, **mark)}))
+            s1, s2 = m.get('score1') or 0, m.get('score2') or 0
+            for side, gf, ga in ((1, s1, s2), (2, s2, s1)):
+                inc = {'matches_played': 1, 'goals_scored': gf, 'goals_against': ga,
+                       'wins': int(gf > ga), 'draws': int(gf == ga), 'losses': int(gf < ga)}
+                # create the row unguarded first so the guarded update never has to upsert
+                standing_ops.append(UpdateOne({'_id': m[f'team{side}']}, {'$setOnInsert': {'country': m[f'team{side}_country']}}, upsert=True))
+                standing_ops.append(UpdateOne(dict({'_id': m[f'team{side}']}, **_not_applied(e['position'])), {'$inc': inc, '$set': mark}))
+    if match_ops:
+        db.matches.bulk_write(match_ops, ordered=True)
+    if player_ops:
+        db.players.bulk_write(player_ops, ordered=True)
+    if standing_ops:
+        db.standings.bulk_write(standing_ops, ordered=True)
+
+
+def reset_views(db, name=VIEWS_CONSUMER):
+    """Clear everything derived by the views consumer so it replays from the start."""
+    utils.reset_player_stats(db)
+    db.players.update_many({}, {'$unset': {'last_event': ''}})
+    db.matches.update_many({}, {'$unset': {'last_event': ''}})
+    db.standings.delete_many({})
+    db.event_checkpoints.delete_one({'_id': name})
+
+
+def clear_log(db):
+    # tournament reset: the matches the events refer to are gone; positions restart at 1
+    db.match_events.delete_many({})
+    db.counters.delete_one({'_id': SEQUENCE_ID})
+    reset_views(db)
+    db.event_checkpoints.delete_many({})
+
+
+def team_stats(db, teams):
+    """Analytics stats per team from standings (all zero for a team that has not played)."""
+    return utils.team_stats_rows(teams, db.standings.find({'_id': {'$in': [t['_id'] for t in teams]}}))
+
+
+def main(argv=None):
+    import os
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    parser = argparse.ArgumentParser(description='Apply the match event log to the materialized views.')
+    parser.add_argument('--rebuild', action='store_true', help='reset the views and replay every event')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args(argv)
+    load_dotenv()
+    db = MongoClient(os.environ['MONGO_URI'])[os.getenv('MONGO_DB', 'anleague')]
+    ensure_event_indexes(db)
+    if args.rebuild:
+        reset_views(db)
+    print(f'applied {consume(db, batch_size=args.batch_size)} events')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
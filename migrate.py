@@ -0,0 +1,54 @@
+"""One-off data migrations, applied once per database.
+
+Each step is claimed in db.migrations before it runs, so several workers
+starting at the same time apply it only once. app.py runs pending steps
+on startup; `python migrate.py` does the same by hand. A step that fails
+releases its claim so the next start retries it, so steps must be safe to
+re-run.
+"""
+import os
+import sys
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+
+import events
+import utils
+
+MIGRATIONS = [
+    # player ids, player docs and stats for data stored before the players collection
+    ('players_v1', utils.migrate_players),
+    # log events for matches played before the event log (needs the player ids above)
+    ('match_events_v1', events.backfill_match_events),
+]
+
+
+def run_migrations(db, log=print):
+    applied = []
+    for name, step in MIGRATIONS:
+        try:
+            db.migrations.insert_one({'_id': name, 'state': 'running', 'started_at': datetime.utcnow()})
+        except DuplicateKeyError:
+            continue
+        log(f'applying migration {name}')
+        try:
+            step(db)
+        except Exception:
+            db.migrations.delete_one({'_id': name})
+            raise
+        db.migrations.update_one({'_id': name}, {'$set': {'state': 'done', 'finished_at': datetime.utcnow()}})
+        applied.append(name)
+    return applied
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    load_dotenv()
+    db = MongoClient(os.environ['MONGO_URI'])[os.getenv('MONGO_DB', 'anleague')]
+    applied = run_migrations(db)
+    print('applied: ' + (', '.join(applied) if applied else 'nothing pending'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
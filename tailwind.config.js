@@ -0,0 +1,6 @@
+/** Purge against every template and script that emits class names. */
+module.exports = {
+  content: ['./templates/**/*.html', './static/*.js', './static/*.html'],
+  theme: { extend: {} },
+  plugins: [],
+};
@@ -0,0 +1,120 @@
+import random
+
+import mongomock
+import pytest
+
+import events
+import utils
+
+
+def played_tournament(db, n_matches=6):
+    random.seed(7)
+    teams = []
+    for country in ('Ghana', 'Mali', 'Chad', 'Togo'):
+        team = utils.demo_team(country)
+        db.teams.insert_one(team)
+        utils.register_team_players(db, team)
+        teams.append(team)
+    events.ensure_event_indexes(db)
+    results = []
+    for _ in range(n_matches):
+        t1, t2 = random.sample(teams, 2)
+        m = {'team1': t1['_id'], 'team2': t2['_id'], 'team1_country': t1['country'], 'team2_country': t2['country'],
+             'stage': 'Quarterfinal', 'played': False, 'score1': None, 'score2': None, 'scorers': []}
+        db.matches.insert_one(m)
+        results.append((m, utils.simulate_match(t1, t2)['events']))
+    events.log_matches(db, results)
+    events.consume(db)
+
+
+def snapshot(db):
+    return {
+        'matches': sorted((m['score1'], m['score2'], m['played']) for m in db.matches.find()),
+        'goals': sum(p['goals'] for p in db.players.find()),
+        'matches_played': sum(p['matches_played'] for p in db.players.find()),
+        'standings': sorted((s['country'], s['matches_played'], s['goals_scored'], s['wins']) for s in db.standings.find()),
+    }
+
+
+@pytest.mark.parametrize('failing', ['players', 'standings'])
+def test_replay_after_crash_between_writes(db, monkeypatch, failing):
+    played_tournament(db)
+    expected = snapshot(db)
+    assert expected['goals'] > 0
+
+    events.reset_views(db)
+    real_bulk_write = mongomock.collection.Collection.bulk_write
+    calls = {'failed': False}
+
+    def bulk_write(self, requests, *args, **kwargs):
+        if self.name == failing and not calls['failed']:
+            calls['failed'] = True
+            raise RuntimeError('crash between writes')
+        return real_bulk_write(self, requests, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', bulk_write)
+    with pytest.raises(RuntimeError):
+        events.consume(db)
+    events.consume(db)
+
+    assert snapshot(db) == expected
+
+
+def test_append_retries_a_partial_insert_without_holes(db, monkeypatch):
+    from pymongo.errors import AutoReconnect
+    real_insert_many = mongomock.collection.Collection.insert_many
+    calls = {'failed': False}
+
+    def insert_many(self, docs, *args, **kwargs):
+        if self.name == 'match_events' and not calls['failed']:
+            # half the batch lands, then the connection drops
+            calls['failed'] = True
+            real_insert_many(self, docs[:len(docs) // 2], *args, **kwargs)
+            raise AutoReconnect('connection lost')
+        return real_insert_many(self, docs, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_many', insert_many)
+    monkeypatch.setattr(events.time, 'sleep', lambda s: None)
+    played_tournament(db)
+
+    assert calls['failed']
+    positions = sorted(d['q'] for d in db.match_events.find())
+    assert positions == list(range(1, len(positions) + 1))
+    assert db.matches.count_documents({'played': True}) == db.matches.count_documents({})
+    expected = snapshot(db)
+    events.reset_views(db)
+    events.consume(db)
+    assert snapshot(db) == expected
+
+
+def test_consume_until_waits_for_an_earlier_batch(db, monkeypatch):
+    played_tournament(db, n_matches=0)
+    teams = list(db.teams.find())
+    pending = []
+    for t1, t2 in ((teams[0], teams[1]), (teams[2], teams[3])):
+        m = {'team1': t1['_id'], 'team2': t2['_id'], 'team1_country': t1['country'], 'team2_country': t2['country'],
+             'stage': 'Semifinal', 'played': False, 'scorers': []}
+        db.matches.insert_one(m)
+        pending.append((m, utils.simulate_match(t1, t2)['events']))
+
+    # the first writer reserves its positions but has not inserted yet
+    real_insert_many = mongomock.collection.Collection.insert_many
+    held = []
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_many', lambda self, docs, **kw: held.append(docs))
+    events.log_matches(db, [pending[0]])
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_many', real_insert_many)
+    _, position = events.log_matches(db, [pending[1]])
+
+    assert events.consume(db) == 0
+    # the first writer finishes while the second waits
+    monkeypatch.setattr(events.time, 'sleep', lambda s: held and real_insert_many(db.match_events, held.pop()))
+    events.consume(db, until=position)
+    assert db.event_checkpoints.find_one({'_id': events.VIEWS_CONSUMER})['last_q'] == position
+    assert db.matches.count_documents({'played': True}) == 2
+
+
+def test_replaying_applied_events_is_a_no_op(db):
+    played_tournament(db)
+    expected = snapshot(db)
+    events.apply_to_views(db, [events.decode_event(d) for d in db.match_events.find().sort('q', 1)])
+    assert snapshot(db) == expected
@@ -57,13 +57,15 @@ def generate_player(i=0):
 
 def build_player(name, natural):
     # create ratings based on natural position
+    from bson.objectid import ObjectId
     ratings = {}
     for pos in POSITIONS:
         if pos == natural:
             ratings[pos] = random.randint(50,100)
         else:
             ratings[pos] = random.randint(0,50)
-    return {'name': name, 'natural': natural, 'ratings': ratings}
+    # stable id so two players with the same generated name never collide in stats
+    return {'player_id': ObjectId(), 'name': name, 'natural': natural, 'ratings': ratings}
 
 def team_rating(players):
     totals = 0
@@ -115,18 +117,24 @@ def simulate_match(team1, team2, use_commentary=False, openai_client=None):
         minute = random_minute()
         gif_local = random.choice(ASSETS['key_moment_gifs'])
         gif_url = get_gif_url(gif_local)
-        scorers.append({'team_country': team1['country'], 'player': player['name'], 'minute': minute, 'gif': gif_url})
+        scorers.append({'team_country': team1['country'], 'player': player['name'], 'player_id': player.get('player_id'), 'minute': minute, 'gif': gif_url})
     for _ in range(score2):
         player = choose_scorer(team2['players'])
         minute = random_minute()
         gif_local = random.choice(ASSETS['key_moment_gifs'])
         gif_url = get_gif_url(gif_local)
-        scorers.append({'team_country': team2['country'], 'player': player['name'], 'minute': minute, 'gif': gif_url})
+        scorers.append({'team_country': team2['country'], 'player': player['name'], 'player_id': player.get('player_id'), 'minute': minute, 'gif': gif_url})
+    # typed events in match order; events.py appends these to the match event log
+    sides = [1] * score1 + [2] * score2
+    events = [{'type': 'kickoff', 'minute': 0}] + goal_events(scorers, sides)
+    full_time = 90
     winner_id = None
     commentary = ''
     if score1 != score2:
         winner_id = team1['_id'] if score1 > score2 else team2['_id']
     else:
+        events.append({'type': 'et_start', 'minute': 90})
+        full_time = 120
         et1 = poisson_random(0.5)
         et2 = poisson_random(0.5)
         score1 += et1
@@ -134,20 +142,24 @@ def simulate_match(team1, team2, use_commentary=False, openai_client=None):
         for _ in range(et1):
             player = choose_scorer(team1['players'])
             gif_local = random.choice(ASSETS['key_moment_gifs'])
-            scorers.append({'team_country': team1['country'], 'player': player['name'], 'minute': random_minute(91,120), 'gif': get_gif_url(gif_local)})
+            scorers.append({'team_country': team1['country'], 'player': player['name'], 'player_id': player.get('player_id'), 'minute': random_minute(91,120), 'gif': get_gif_url(gif_local)})
         for _ in range(et2):
             player = choose_scorer(team2['players'])
             gif_local = random.choice(ASSETS['key_moment_gifs'])
-            scorers.append({'team_country': team2['country'], 'player': player['name'], 'minute': random_minute(91,120), 'gif': get_gif_url(gif_local)})
+            scorers.append({'team_country': team2['country'], 'player': player['name'], 'player_id': player.get('player_id'), 'minute': random_minute(91,120), 'gif': get_gif_url(gif_local)})
+        events += goal_events(scorers[len(sides):], [1] * et1 + [2] * et2)
         if score1 != score2:
             winner_id = team1['_id'] if score1 > score2 else team2['_id']
         else:
-            p1, p2 = penalty_shootout()
+            kicks = penalty_kicks()
+            p1, p2 = tally_kicks(kicks)
+            events += [{'type': 'penalty', 'minute': 120, 'side': side, 'scored': scored} for side, scored in kicks]
             if p1 > p2:
                 winner_id = team1['_id']
             else:
                 winner_id = team2['_id']
             commentary += f"Penalties {p1}-{p2}."
+    events.append({'type': 'full_time', 'minute': full_time, 'winner': 1 if winner_id == team1['_id'] else 2})
     # generate commentary via OpenAI client if provided
     if openai_client and use_commentary:
         try:
@@ -182,6 +194,7 @@ def simulate_match(team1, team2, use_commentary=False, openai_client=None):
         'scorers': sorted(scorers, key=lambda s: s['minute']),
         'winner_id': winner_id,
         'commentary': commentary,
+        'events': events,
         'assets': {
             'goal_sfx': ASSETS['goal_sfx'],
             'crowd_cheer': ASSETS['crowd_cheer']
@@ -220,52 +233,189 @@ def choose_scorer(players):
 def random_minute(a=1, b=90):
     return random.randint(a, b)
 
-def penalty_shootout():
+def goal_events(scorers, sides):
+    evs = []
+    for s, side in zip(scorers, sides):
+        evs.append({'type': 'goal', 'minute': s['minute'], 'side': side, 'player_id': s.get('player_id'), 'player': s['player'], 'gif': s.get('gif')})
+    return sorted(evs, key=lambda e: e['minute'])
+
+def penalty_kicks():
+    # each kick as (side, scored): five each, then sudden death
+    kicks = []
     s1 = 0
     s2 = 0
     for _ in range(5):
-        if random.random() < 0.75: s1 += 1
-        if random.random() < 0.75: s2 += 1
+        k1 = random.random() < 0.75
+        k2 = random.random() < 0.75
+        kicks += [(1, k1), (2, k2)]
+        s1 += k1
+        s2 += k2
     while s1 == s2:
-        if random.random() < 0.75: s1 += 1
-        if random.random() < 0.75: s2 += 1
+        k1 = random.random() < 0.75
+        k2 = random.random() < 0.75
+        kicks += [(1, k1), (2, k2)]
+        s1 += k1
+        s2 += k2
+    return kicks
+
+def tally_kicks(kicks):
+    s1 = sum(1 for side, scored in kicks if side == 1 and scored)
+    s2 = sum(1 for side, scored in kicks if side == 2 and scored)
     return s1, s2
 
-# Analytics helper: compute simple stats for a team
-def compute_team_stats(team_doc, db):
-    # total goals scored in matches
-    from bson.objectid import ObjectId
-    matches = list(db.matches.find({'$or': [{'team1': team_doc['_id']}, {'team2': team_doc['_id']}], 'played': True}))
-    goals_scored = 0
-    goals_against = 0
-    wins = 0
-    losses = 0
-    draws = 0
-    for m in matches:
-        if m['team1'] == team_doc['_id']:
-            goals_scored += m.get('score1',0)
-            goals_against += m.get('score2',0)
-            if m.get('score1') > m.get('score2'): wins += 1
-            elif m.get('score1') < m.get('score2'): losses += 1
-            else: draws += 1
-        else:
-            goals_scored += m.get('score2',0)
-            goals_against += m.get('score1',0)
-            if m.get('score2') > m.get('score1'): wins += 1
-            elif m.get('score2') < m.get('score1'): losses += 1
-            else: draws += 1
-    return {'goals_scored': goals_scored, 'goals_against': goals_against, 'wins': wins, 'losses': losses, 'draws': draws, 'matches_played': len(matches)}
-
-# Top scorers across db
+# Analytics: per-team stats, kept in db.standings by the match event consumer (events.py)
+TEAM_STAT_KEYS = ('goals_scored', 'goals_against', 'wins', 'losses', 'draws', 'matches_played')
+
+def team_stats_rows(teams, standings):
+    # stats per team in team order from fetched standings docs; zeros for a team yet to play
+    by_team = {s['_id']: s for s in standings}
+    return [{k: by_team.get(t['_id'], {}).get(k, 0) for k in TEAM_STAT_KEYS} for t in teams]
+
+# Top scorers across db (served from the players collection, goals index)
+TOP_SCORERS_QUERY = {'goals': {'$gt': 0}}
+TOP_SCORERS_SORT = [('goals', -1), ('name_lower', 1)]
+
 def top_scorers(db, limit=10):
-    scorers = {}
+    return scorer_rows(db.players.find(TOP_SCORERS_QUERY).sort(TOP_SCORERS_SORT).limit(limit))
+
+def scorer_rows(players):
+    return [scorer_row(p) for p in players]
+
+def scorer_row(p):
+    return {'team': p['team_country'], 'player': p['name'], 'player_id': p['_id'], 'goals': p['goals']}
+
+# Player statistics store
+# One doc per player in db.players keyed on the stable player_id; goals,
+# goal minutes and matches are bumped incrementally by the match event
+# consumer in events.py.
+
+def ensure_player_indexes(db):
+    db.players.create_index('name_lower')
+    db.players.create_index('team_id')
+    db.players.create_index([('goals', -1), ('name_lower', 1)])
+    db.matches.create_index('team1')
+    db.matches.create_index('team2')
+
+def player_doc(player, team):
+    return {
+        '_id': player['player_id'],
+        'name': player['name'],
+        'name_lower': player['name'].lower(),
+        'position': player.get('natural'),
+        'team_id': team['_id'],
+        'team_country': team['country'],
+        'goals': 0,
+        'goal_minutes': [],
+        'matches_played': 0,
+        'created_at': datetime.utcnow(),
+    }
+
+def register_team_players(db, team):
+    # team must already be inserted (needs team['_id'])
+    docs = [player_doc(p, team) for p in team.get('players', []) if p.get('player_id')]
+    if docs:
+        db.players.insert_many(docs, ordered=False)
+
+def ensure_player_ids(db, team):
+    """Give ids to squads stored before players had them; returns the team."""
+    from bson.objectid import ObjectId
+    missing = [p for p in team.get('players', []) if not p.get('player_id')]
+    if not missing:
+        return team
+    for p in missing:
+        p['player_id'] = ObjectId()
+    db.teams.update_one({'_id': team['_id']}, {'$set': {'players': team['players']}})
+    db.players.insert_many([player_doc(p, team) for p in missing], ordered=False)
+    return team
+
+def migrate_players(db):
+    """Ids and player docs for every stored squad, stats seeded from played matches.
+
+    Safe to re-run: stats are recomputed from scratch. Scorers saved before
+    players had ids only carry a name, so they are matched to the first
+    squad player with that name and the id is written back onto the match
+    (events.backfill_match_events relies on it).
+    """
+    from bson.objectid import ObjectId
+    from pymongo import UpdateOne, UpdateMany
+    teams = {}
+    for team in db.teams.find():
+        if any(not p.get('player_id') for p in team.get('players', [])):
+            for p in team['players']:
+                p.setdefault('player_id', ObjectId())
+            db.teams.update_one({'_id': team['_id']}, {'$set': {'players': team['players']}})
+        ops = []
+        for p in team.get('players', []):
+            doc = player_doc(p, team)
+            del doc['_id']
+            ops.append(UpdateOne({'_id': p['player_id']}, {'$setOnInsert': doc}, upsert=True))
+        if ops:
+            db.players.bulk_write(ops, ordered=False)
+        teams[team['_id']] = team
+    reset_player_stats(db)
+    ops = []
     for m in db.matches.find({'played': True}):
+        squads = [t['_id'] for t in (teams.get(m.get('team1')), teams.get(m.get('team2'))) if t]
+        if squads:
+            ops.append(UpdateMany({'team_id': {'$in': squads}}, {'$inc': {'matches_played': 1}}))
+        resolved = False
         for s in m.get('scorers', []):
-            key = (s['team_country'], s['player'])
-            scorers[key] = scorers.get(key, 0) + 1
-    lst = [{'team': k[0], 'player': k[1], 'goals': v} for k,v in scorers.items()]
-    lst.sort(key=lambda x: x['goals'], reverse=True)
-    return lst[:limit]
+            if not s.get('player_id'):
+                s['player_id'] = find_scorer_id(s, m, teams)
+                resolved = resolved or s['player_id'] is not None
+            if s.get('player_id'):
+                ops.append(UpdateOne({'_id': s['player_id']}, {'$inc': {'goals': 1}, '$push': {'goal_minutes': s['minute']}}))
+        if resolved:
+            db.matches.update_one({'_id': m['_id']}, {'$set': {'scorers': m['scorers']}})
+    if ops:
+        db.players.bulk_write(ops, ordered=True)
+
+def find_scorer_id(scorer, match, teams):
+    # look in the squad whose country matches first, then the other one
+    squads = []
+    for side in (1, 2):
+        team = teams.get(match.get(f'team{side}'))
+        if not team:
+            continue
+        if scorer.get('team_country') == match.get(f'team{side}_country'):
+            squads.insert(0, team)
+        else:
+            squads.append(team)
+    for team in squads:
+        for p in team.get('players', []):
+            if p['name'] == scorer.get('player'):
+                return p['player_id']
+    return None
+
+def player_summary(p):
+    # JSON-safe view used by the search endpoints
+    return {
+        'id': str(p['_id']),
+        'name': p['name'],
+        'team': p['team_country'],
+        'position': p.get('position'),
+        'goals': p.get('goals', 0),
+    }
+
+def reset_player_stats(db):
+    db.players.update_many({}, {'$set': {'goals': 0, 'goal_minutes': [], 'matches_played': 0}})
+
+def delete_team_players(db, team_id):
+    db.players.delete_many({'team_id': team_id})
+
+def player_search_query(prefix):
+    import re
+    prefix = (prefix or '').strip().lower()
+    if not prefix:
+        return None
+    # anchored regex on the lowercased name is answered from the name_lower index
+    return {'name_lower': {'$regex': '^' + re.escape(prefix)}}
+
+def search_players(db, prefix, limit=20):
+    query = player_search_query(prefix)
+    if query is None:
+        return []
+    return list(db.players.find(query).sort('name_lower', 1).limit(limit))
 
 # Seed demo teams
 